@@ -10,7 +10,9 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QCheckBox, QSpinBox, QComboBox, QMessageBox,
                              QTabWidget, QGridLayout, QSlider, QStatusBar)
 
-from markdown_to_pdf_converter import MarkdownToPDFConverter
+from markdown_to_pdf_converter import MarkdownToPDFConverter, PlaywrightBackend
+
+PDF_ENGINES = ['wkhtmltopdf', 'Chromium (Playwright)']
 
 
 class ConversionThread(QThread):
@@ -20,6 +22,7 @@ class ConversionThread(QThread):
 	conversion_finished = pyqtSignal(bool, str)
 
 	def __init__(self, converter, input_file, output_file, title, options):
+		"""input_file may also be a list of files to batch into one PDF"""
 		super().__init__()
 		self.converter = converter
 		self.input_file = input_file
@@ -32,9 +35,6 @@ class ConversionThread(QThread):
 			self.status_updated.emit("Reading markdown file...")
 			self.progress_updated.emit(10)
 
-			# Update converter options
-			self.converter.pdf_options.update(self.options)
-
 			self.status_updated.emit("Converting markdown to HTML...")
 			self.progress_updated.emit(30)
 
@@ -44,11 +44,19 @@ class ConversionThread(QThread):
 			self.status_updated.emit("Generating PDF...")
 			self.progress_updated.emit(80)
 
-			output_path = self.converter.convert_to_pdf(
-				self.input_file,
-				self.output_file,
-				self.title
-			)
+			if isinstance(self.input_file, list):
+				output_path = self.converter.convert_many(
+					self.input_file,
+					self.output_file,
+					options=self.options
+				)
+			else:
+				output_path = self.converter.convert_to_pdf(
+					self.input_file,
+					self.output_file,
+					self.title,
+					options=self.options
+				)
 
 			self.progress_updated.emit(100)
 			self.status_updated.emit("Conversion completed successfully!")
@@ -59,16 +67,54 @@ class ConversionThread(QThread):
 			self.conversion_finished.emit(False, str(e))
 
 
+class CachedSettings:
+	"""QSettings wrapper that keeps values in memory and only writes changed ones"""
+
+	def __init__(self, settings):
+		self._settings = settings
+		self._cache = {}
+
+	def value(self, key, default=None, type=None):
+		if key not in self._cache:
+			if type is None:
+				self._cache[key] = self._settings.value(key, default)
+			else:
+				self._cache[key] = self._settings.value(key, default, type=type)
+		return self._cache[key]
+
+	def setValue(self, key, value):
+		if key in self._cache and self._cache[key] == value:
+			return
+		self._cache[key] = value
+		self._settings.setValue(key, value)
+
+	def sync(self):
+		self._settings.sync()
+
+
 class MarkdownToPDFGUI(QMainWindow):
 	def __init__(self):
 		super().__init__()
 		self.converter = MarkdownToPDFConverter()
-		self.settings = QSettings('MarkdownToPDF', 'Converter')
+		# The converter is reused (with its image caches and worker pool) until these change
+		self.converter_config = (None, 'wkhtmltopdf')
+		self.settings = CachedSettings(QSettings('MarkdownToPDF', 'Converter'))
 		self.conversion_thread = None
+		self.playwright_backend = None
+		self._pdf_opts_cache = None
 
 		self.init_ui()
 		self.load_settings()
 
+		# PDF options are only rebuilt after one of their widgets changed
+		self.page_size_combo.currentTextChanged.connect(self._invalidate_pdf_opts)
+		for spin in (self.margin_top_spin, self.margin_bottom_spin,
+		             self.margin_left_spin, self.margin_right_spin):
+			spin.valueChanged.connect(self._invalidate_pdf_opts)
+
+		# Shut worker processes and the headless browser down together with the application
+		QApplication.instance().aboutToQuit.connect(self.release_resources)
+
 	def init_ui(self):
 		self.setWindowTitle("Markdown to PDF Converter")
 		self.setGeometry(100, 100, 1000, 700)
@@ -174,7 +220,16 @@ class MarkdownToPDFGUI(QMainWindow):
             }
         """)
 		self.convert_btn.clicked.connect(self.start_conversion)
-		layout.addWidget(self.convert_btn)
+
+		# Batch conversion button
+		self.batch_convert_btn = QPushButton("Batch Convert")
+		self.batch_convert_btn.setToolTip("Combine several markdown files into a single PDF")
+		self.batch_convert_btn.clicked.connect(self.start_batch_conversion)
+
+		buttons_layout = QHBoxLayout()
+		buttons_layout.addWidget(self.convert_btn, 1)
+		buttons_layout.addWidget(self.batch_convert_btn)
+		layout.addLayout(buttons_layout)
 
 		# Log area
 		log_group = QGroupBox("Conversion Log")
@@ -254,6 +309,18 @@ class MarkdownToPDFGUI(QMainWindow):
 
 		layout.addWidget(image_group)
 
+		# PDF engine
+		engine_group = QGroupBox("PDF Engine")
+		engine_layout = QGridLayout(engine_group)
+
+		engine_layout.addWidget(QLabel("Render with:"), 0, 0)
+		self.pdf_engine_combo = QComboBox()
+		self.pdf_engine_combo.addItems(PDF_ENGINES)
+		self.pdf_engine_combo.setToolTip("Chromium keeps one browser running and reuses it for every conversion")
+		engine_layout.addWidget(self.pdf_engine_combo, 0, 1)
+
+		layout.addWidget(engine_group)
+
 		# wkhtmltopdf path
 		path_group = QGroupBox("wkhtmltopdf Configuration")
 		path_layout = QGridLayout(path_group)
@@ -371,8 +438,16 @@ class MarkdownToPDFGUI(QMainWindow):
 		if file_path:
 			self.wkhtmltopdf_path_edit.setText(file_path)
 
+	def _invalidate_pdf_opts(self):
+		self._pdf_opts_cache = None
+
 	def get_pdf_options(self):
 		"""Get PDF options from the settings"""
+		if self._pdf_opts_cache is None:
+			self._pdf_opts_cache = self._build_pdf_options()
+		return self._pdf_opts_cache
+
+	def _build_pdf_options(self):
 		return {
 			'page-size': self.page_size_combo.currentText(),
 			'margin-top': f'{self.margin_top_spin.value()}in',
@@ -384,6 +459,21 @@ class MarkdownToPDFGUI(QMainWindow):
 			'enable-local-file-access': None
 		}
 
+	def get_pdf_backend(self):
+		"""Return the shared Chromium backend, or 'wkhtmltopdf'"""
+		if self.pdf_engine_combo.currentText() == 'wkhtmltopdf':
+			return 'wkhtmltopdf'
+
+		if self.playwright_backend is None:
+			self.playwright_backend = PlaywrightBackend()
+		return self.playwright_backend
+
+	def release_resources(self):
+		self.converter.close()
+		if self.playwright_backend is not None:
+			self.playwright_backend.close()
+			self.playwright_backend = None
+
 	def start_conversion(self):
 		input_file = self.input_file_edit.text().strip()
 		if not input_file:
@@ -397,18 +487,46 @@ class MarkdownToPDFGUI(QMainWindow):
 		output_file = self.output_file_edit.text().strip()
 		title = self.title_edit.text().strip()
 
+		self.run_conversion(input_file, output_file, title)
+
+	def start_batch_conversion(self):
+		input_files, _ = QFileDialog.getOpenFileNames(
+			self, "Select Markdown Files", "",
+			"Markdown Files (*.md *.markdown);;All Files (*)"
+		)
+		if not input_files:
+			return
+
+		output_file, _ = QFileDialog.getSaveFileName(
+			self, "Save Combined PDF As", str(Path(input_files[0]).with_suffix('.pdf')),
+			"PDF Files (*.pdf);;All Files (*)"
+		)
+		if not output_file:
+			return
+
+		self.run_conversion(input_files, output_file, None)
+
+	def run_conversion(self, input_file, output_file, title):
+		"""Start the conversion thread for a single file or a list of files"""
 		# Update converter settings
-		wkhtmltopdf_path = self.wkhtmltopdf_path_edit.text().strip()
-		if wkhtmltopdf_path:
-			self.converter = MarkdownToPDFConverter(wkhtmltopdf_path)
-		else:
-			self.converter = MarkdownToPDFConverter()
+		wkhtmltopdf_path = self.wkhtmltopdf_path_edit.text().strip() or None
+		try:
+			converter_config = (wkhtmltopdf_path, self.get_pdf_backend())
+			if converter_config != self.converter_config:
+				new_converter = MarkdownToPDFConverter(wkhtmltopdf_path, backend=converter_config[1])
+				self.converter.close()
+				self.converter = new_converter
+				self.converter_config = converter_config
+		except Exception as e:
+			QMessageBox.critical(self, "Error", f"Could not start the PDF engine:\n\n{str(e)}")
+			return
 
 		# Get PDF options
 		options = self.get_pdf_options()
 
-		# Disable convert button and show progress
+		# Disable convert buttons and show progress
 		self.convert_btn.setEnabled(False)
+		self.batch_convert_btn.setEnabled(False)
 		self.progress_bar.setVisible(True)
 		self.progress_bar.setValue(0)
 
@@ -430,6 +548,7 @@ class MarkdownToPDFGUI(QMainWindow):
 
 	def conversion_finished(self, success, result):
 		self.convert_btn.setEnabled(True)
+		self.batch_convert_btn.setEnabled(True)
 		self.progress_bar.setVisible(False)
 
 		if success:
@@ -466,6 +585,12 @@ class MarkdownToPDFGUI(QMainWindow):
 
 	def save_settings(self):
 		"""Save current settings"""
+		self.write_settings()
+
+		QMessageBox.information(self, "Settings", "Settings saved successfully!")
+
+	def write_settings(self):
+		"""Store current settings, unchanged values are not written again"""
 		self.settings.setValue('page_size', self.page_size_combo.currentText())
 		self.settings.setValue('margin_top', self.margin_top_spin.value())
 		self.settings.setValue('margin_bottom', self.margin_bottom_spin.value())
@@ -475,8 +600,7 @@ class MarkdownToPDFGUI(QMainWindow):
 		self.settings.setValue('image_quality', self.image_quality_slider.value())
 		self.settings.setValue('wkhtmltopdf_path', self.wkhtmltopdf_path_edit.text())
 		self.settings.setValue('include_images', self.include_images_cb.isChecked())
-
-		QMessageBox.information(self, "Settings", "Settings saved successfully!")
+		self.settings.setValue('pdf_engine', self.pdf_engine_combo.currentText())
 
 	def load_settings(self):
 		"""Load saved settings"""
@@ -484,18 +608,23 @@ class MarkdownToPDFGUI(QMainWindow):
 		if page_size in ['A4', 'Letter', 'A3', 'A5', 'Legal']:
 			self.page_size_combo.setCurrentText(page_size)
 
-		self.margin_top_spin.setValue(int(self.settings.value('margin_top', 1)))
-		self.margin_bottom_spin.setValue(int(self.settings.value('margin_bottom', 1)))
-		self.margin_left_spin.setValue(int(self.settings.value('margin_left', 1)))
-		self.margin_right_spin.setValue(int(self.settings.value('margin_right', 1)))
-		self.image_width_spin.setValue(int(self.settings.value('image_width', 800)))
-		self.image_quality_slider.setValue(int(self.settings.value('image_quality', 85)))
+		self.margin_top_spin.setValue(self.settings.value('margin_top', 1, type=int))
+		self.margin_bottom_spin.setValue(self.settings.value('margin_bottom', 1, type=int))
+		self.margin_left_spin.setValue(self.settings.value('margin_left', 1, type=int))
+		self.margin_right_spin.setValue(self.settings.value('margin_right', 1, type=int))
+		self.image_width_spin.setValue(self.settings.value('image_width', 800, type=int))
+		self.image_quality_slider.setValue(self.settings.value('image_quality', 85, type=int))
 		self.wkhtmltopdf_path_edit.setText(self.settings.value('wkhtmltopdf_path', ''))
 		self.include_images_cb.setChecked(self.settings.value('include_images', True, type=bool))
 
+		pdf_engine = self.settings.value('pdf_engine', 'wkhtmltopdf')
+		if pdf_engine in PDF_ENGINES:
+			self.pdf_engine_combo.setCurrentText(pdf_engine)
+
 	def closeEvent(self, event):
 		"""Handle application close"""
-		self.save_settings()
+		self.write_settings()
+		self.settings.sync()
 		if self.conversion_thread and self.conversion_thread.isRunning():
 			reply = QMessageBox.question(
 				self, "Close Application",
@@ -1,7 +1,17 @@
-import base64
+import asyncio
+import hashlib
+import html
 import io
+import json
+import multiprocessing
 import os
+import re
+import secrets
+import shutil
 import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 import markdown
@@ -9,17 +19,482 @@ import pdfkit
 import requests
 from PIL import Image
 from bs4 import BeautifulSoup
+from markdown.extensions.toc import slugify, strip_tags, unique
+from requests.adapters import HTTPAdapter
+
+try:
+	import aiohttp
+except ImportError:
+	aiohttp = None
+
+try:
+	import mistune
+	from mistune.core import BlockState
+except ImportError:
+	mistune = None
+
+try:
+	from playwright.sync_api import sync_playwright
+except ImportError:
+	sync_playwright = None
+
+try:
+	import cv2
+	import numpy as np
+except ImportError:
+	cv2 = None
+
+try:
+	import numpy as np
+	from turbojpeg import TJPF_RGB, TurboJPEG
+except ImportError:
+	TurboJPEG = None
+
+try:
+	from pygments import highlight
+	from pygments.formatters import HtmlFormatter
+	from pygments.lexers import get_lexer_by_name
+	from pygments.util import ClassNotFound
+except ImportError:
+	highlight = None
+
+# Number of images fetched/optimized concurrently
+_MAX_IMAGE_WORKERS = 8
+
+# Keep-alive connections kept per host; more than the workers so several hosts stay warm
+_HTTP_POOL_SIZE = 16
+
+# Concurrent connections for remote images when aiohttp is installed
+_ASYNC_DOWNLOAD_LIMIT = 32
+
+# Per-user cache root; a fixed path in the shared temp dir could be planted by other users
+_CACHE_ROOT = Path(
+	(os.environ.get('LOCALAPPDATA') if os.name == 'nt' else os.environ.get('XDG_CACHE_HOME'))
+	or Path.home() / '.cache'
+) / 'md2pdf'
+
+# Remote images are kept here between runs and revalidated with If-Modified-Since
+_IMAGE_CACHE_DIR = _CACHE_ROOT / 'images'
+
+# Rendered PDFs, reused when the same document is converted again with the same settings
+_PDF_CACHE_DIR = _CACHE_ROOT / 'pdf'
+
+# Bump when rendering changes in a way the stylesheet hash does not capture, so old PDFs are not reused
+_PDF_CACHE_VERSION = 1
+
+# Least recently used entries are removed once a disk cache grows beyond this
+_IMAGE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+_PDF_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Optimized images kept in memory across conversions, least recently used are dropped first
+_OPT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# JPEGs below this size that already fit max_width are embedded unchanged
+_SMALL_JPEG_BYTES = 100_000
+
+# Spawning the worker processes costs more than encoding a few small images inline
+_PROCESS_POOL_MIN_BYTES = 4 * 1024 * 1024
+
+_IMG_STYLE = 'max-width: 100%; height: auto;'
+
+# Separates documents when several files are printed as one page by Chromium
+_PAGE_BREAK = '<div style="page-break-after: always;"></div>'
+
+_IMG_OPEN_RE = re.compile(r'<img\b', re.I)
+_IMG_RE = re.compile(r'<img\b([^>]*?)\ssrc=(["\'])(.*?)\2([^>]*)>', re.I | re.S)
+_STYLE_RE = re.compile(r'(?<=\s)style=(["\'])(.*?)\1', re.I | re.S)
+
+# Written once per converter to a temp file and linked from every page
+_CSS_STYLES = """\
+body {
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
+    line-height: 1.6;
+    color: #333;
+    max-width: 100%;
+    margin: 0;
+    padding: 20px;
+}
+
+h1, h2, h3, h4, h5, h6 {
+    color: #2c3e50;
+    margin-top: 2em;
+    margin-bottom: 1em;
+}
+
+h1 { font-size: 2.5em; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
+h2 { font-size: 2em; border-bottom: 1px solid #bdc3c7; padding-bottom: 5px; }
+h3 { font-size: 1.5em; }
+
+p { margin-bottom: 1em; text-align: justify; }
+
+img {
+    max-width: 100%;
+    height: auto;
+    display: block;
+    margin: 20px auto;
+    border-radius: 5px;
+    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
+}
+
+code {
+    background-color: #f8f9fa;
+    padding: 2px 4px;
+    border-radius: 3px;
+    font-family: 'Courier New', monospace;
+    font-size: 0.9em;
+}
+
+pre {
+    background-color: #f8f9fa;
+    padding: 15px;
+    border-radius: 5px;
+    border-left: 4px solid #3498db;
+    overflow-x: auto;
+    margin: 1em 0;
+}
+
+pre code {
+    background: none;
+    padding: 0;
+}
+
+table {
+    border-collapse: collapse;
+    width: 100%;
+    margin: 1em 0;
+}
+
+th, td {
+    border: 1px solid #ddd;
+    padding: 12px;
+    text-align: left;
+}
+
+th {
+    background-color: #f2f2f2;
+    font-weight: bold;
+}
+
+blockquote {
+    border-left: 4px solid #3498db;
+    margin: 1em 0;
+    padding-left: 20px;
+    color: #666;
+    font-style: italic;
+}
+
+ul, ol {
+    margin: 1em 0;
+    padding-left: 2em;
+}
+
+li {
+    margin-bottom: 0.5em;
+}
+
+a {
+    color: #3498db;
+    text-decoration: none;
+}
+
+a:hover {
+    text-decoration: underline;
+}
+"""
+
+
+def _private_dir(path):
+	"""Create path (and the cache root) readable by the current user only"""
+	for directory in (_CACHE_ROOT, path):
+		directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+		os.chmod(directory, 0o700)
+	return path
+
+
+def _atomic_write(path, data):
+	"""Write data next to path and rename it into place, so readers never see a partial file"""
+	fd, partial_path = tempfile.mkstemp(dir=path.parent, prefix=f'{path.name}.', suffix='.part')
+	try:
+		with os.fdopen(fd, 'wb') as partial_file:
+			partial_file.write(data)
+		os.replace(partial_path, path)
+	except BaseException:
+		try:
+			os.unlink(partial_path)
+		except OSError:
+			pass
+		raise
+
+
+def _prune_cache(directory, max_bytes):
+	"""Delete least recently used entries beyond max_bytes; files sharing a name stem are one entry"""
+	entries = {}
+	for path in directory.iterdir():
+		if not path.name.endswith('.part'):
+			entries.setdefault(path.name.split('.')[0], []).append(path)
+
+	# Hits refresh the mtime, so the newest entries are kept
+	entries = sorted(entries.values(), key=lambda paths: max(path.stat().st_mtime for path in paths), reverse=True)
+	total_size = 0
+	for paths in entries:
+		total_size += sum(path.stat().st_size for path in paths)
+		if total_size > max_bytes:
+			for path in paths:
+				path.unlink()
+
+
+def _event_loop_running():
+	try:
+		asyncio.get_running_loop()
+	except RuntimeError:
+		return False
+	return True
+
+
+def _add_img_style(match):
+	quote, style = match.groups()
+	if 'max-width' not in style:
+		style += _IMG_STYLE
+	return f'style={quote}{style}{quote}'
+
+
+if mistune is not None:
+	class _HighlightRenderer(mistune.HTMLRenderer):
+		"""mistune renderer that highlights fenced code like python-markdown's codehilite"""
+
+		def block_code(self, code, info=None):
+			lang = info.split(None, 1)[0] if info and info.strip() else None
+			if highlight is None or not lang:
+				return super().block_code(code, info)
+
+			try:
+				lexer = get_lexer_by_name(lang)
+			except ClassNotFound:
+				return super().block_code(code, info)
+			return highlight(code, lexer, HtmlFormatter(cssclass='codehilite', wrapcode=True))
+
+	def _add_heading_ids(md, state):
+		"""before_render hook giving headings the ids python-markdown's toc extension would"""
+		used_ids = set()
+		for token in state.tokens:
+			if token['type'] != 'heading':
+				continue
+			# Slug of the rendered text, made unique with _1, _2, ... suffixes
+			text = html.unescape(strip_tags(md.renderer(md.inline(token['text'], state.env), BlockState())))
+			token['attrs']['id'] = unique(slugify(text, '-'), used_ids)
+
+
+# libjpeg-turbo encoder, loaded lazily in each worker process; False when unavailable
+_turbo_jpeg = None
+
+
+def _encode_jpeg(img, quality):
+	global _turbo_jpeg
+	if _turbo_jpeg is None:
+		try:
+			_turbo_jpeg = TurboJPEG() if TurboJPEG is not None else False
+		except (OSError, RuntimeError):
+			# PyTurboJPEG is installed but the libjpeg-turbo shared library is not
+			_turbo_jpeg = False
+
+	if _turbo_jpeg and img.mode == 'RGB':
+		return _turbo_jpeg.encode(np.asarray(img), quality=quality, pixel_format=TJPF_RGB)
+
+	output = io.BytesIO()
+	img.save(output, format='JPEG', quality=quality, optimize=True)
+	return output.getvalue()
+
+
+def _image_extension(image_data):
+	"""File extension for optimized image bytes, which are not always JPEG"""
+	if image_data.startswith(b'\x89PNG\r\n\x1a\n'):
+		return 'png'
+	if image_data.startswith((b'GIF87a', b'GIF89a')):
+		return 'gif'
+	if b'<svg' in image_data[:1024]:
+		return 'svg'
+	return 'jpg'
+
+
+def _resize_to_width(img, max_width):
+	new_height = int(img.height * max_width / img.width)
+
+	# OpenCV's LANCZOS is SIMD-optimized and multithreaded, Pillow's runs on one core
+	if cv2 is not None and img.mode in ('RGB', 'L'):
+		resized = cv2.resize(np.asarray(img), (max_width, new_height), interpolation=cv2.INTER_LANCZOS4)
+		return Image.fromarray(resized)
+
+	return img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+
+
+def _is_small_jpeg(img, image_data, max_width):
+	"""Small JPEGs that already fit gain nothing from another lossy re-encode"""
+	return img.format == 'JPEG' and img.width <= max_width and len(image_data) < _SMALL_JPEG_BYTES
+
+
+def _optimize_image(image_data, max_width, quality):
+	try:
+		# Only the header is read here, pixels are decoded on first access
+		img = Image.open(io.BytesIO(image_data))
+
+		if _is_small_jpeg(img, image_data, max_width):
+			return image_data
+
+		# Diagrams and other low-color PNGs compress better, and stay sharper, as PNG
+		if img.format == 'PNG' and (img.mode == 'P' or img.getcolors(256) is not None):
+			if img.width > max_width:
+				# Resampling invents new colors, quantize back so the result stays a palette PNG
+				img = _resize_to_width(img.convert('RGBA'), max_width)
+				img = img.quantize(256, method=Image.Quantize.FASTOCTREE)
+			output = io.BytesIO()
+			img.save(output, format='PNG', optimize=True)
+
+			# Palette photos (adaptive 256-color images) are still smaller as JPEG
+			return min(output.getvalue(), _encode_jpeg(img.convert('RGB'), quality), key=len)
+
+		if img.mode in ('RGBA', 'LA', 'P'):
+			img = img.convert('RGB')
+
+		if img.width > max_width:
+			img = _resize_to_width(img, max_width)
+
+		return _encode_jpeg(img, quality)
+
+	except Exception:
+		return image_data
+
+
+def _init_image_worker():
+	"""Process pool initializer; the pool already uses every core, so OpenCV gets one thread per worker"""
+	if cv2 is not None:
+		cv2.setNumThreads(1)
+
+
+def _optimize_image_worker(task):
+	"""Process pool entry point, kept at module level so it can be pickled"""
+	return _optimize_image(*task)
+
+
+class PlaywrightBackend:
+	"""Headless Chromium PDF renderer that stays alive between conversions.
+
+	Playwright's sync API is bound to the thread that started it, so every call
+	is run on one dedicated worker thread. The backend can then be shared by
+	converters running on different conversion threads.
+	"""
+
+	def __init__(self):
+		if sync_playwright is None:
+			raise Exception("The Chromium backend requires playwright "
+			                "(pip install playwright && playwright install chromium)")
+
+		self._executor = ThreadPoolExecutor(max_workers=1)
+		self._playwright = None
+		self._browser = None
+		self._page = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def from_file(self, html_path, output_pdf_path, options):
+		self._executor.submit(self._render, html_path, output_pdf_path, options).result()
+
+	def close(self):
+		self._executor.submit(self._stop).result()
+		self._executor.shutdown()
+
+	def _render(self, html_path, output_pdf_path, options):
+		if self._page is None:
+			if self._playwright is None:
+				self._playwright = sync_playwright().start()
+			self._browser = self._playwright.chromium.launch()
+			self._page = self._browser.new_page()
+
+		# Loaded from disk rather than set_content() so file:// resources are allowed
+		self._page.goto(Path(html_path).as_uri(), wait_until='load')
+		self._page.pdf(
+			path=str(output_pdf_path),
+			format=options.get('page-size', 'A4'),
+			margin={side: options.get(f'margin-{side}', '0.75in') for side in ('top', 'right', 'bottom', 'left')},
+			print_background=True,
+		)
+
+	def _stop(self):
+		if self._browser is not None:
+			self._browser.close()
+		if self._playwright is not None:
+			self._playwright.stop()
+		self._playwright = self._browser = self._page = None
 
 
 class MarkdownToPDFConverter:
 	"""Core converter class (same as before but with progress callbacks)"""
 
-	def __init__(self, wkhtmltopdf_path=None, progress_callback=None):
+	def __init__(self, wkhtmltopdf_path=None, progress_callback=None, markdown_backend='mistune',
+	             backend='wkhtmltopdf'):
+		"""backend is 'wkhtmltopdf', 'playwright' or a shared PlaywrightBackend instance"""
 		self.wkhtmltopdf_path = wkhtmltopdf_path
 		self.progress_callback = progress_callback
 		self.temp_files = []
 
-		self.config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path) if wkhtmltopdf_path else None
+		# Raw bytes per remote URL for the current document, optimized bytes per (sha1, max_width, quality)
+		self._raw_cache = {}
+		self._opt_cache = OrderedDict()
+		self._opt_cache_bytes = 0
+
+		# Set when a remote image was written to disk, the disk cache is pruned in cleanup()
+		self._image_cache_grown = False
+
+		# Started on the first document with several images to optimize
+		self._process_pool = None
+
+		# Optimized images are written here and linked from the HTML instead of inlined
+		self._image_dir = None
+
+		# Stylesheet shared by every conversion, removed in close()
+		self._css_path = None
+
+		# Shared session so image downloads reuse keep-alive connections
+		self._session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=_HTTP_POOL_SIZE, pool_maxsize=_HTTP_POOL_SIZE, max_retries=3)
+		self._session.mount('https://', adapter)
+		self._session.mount('http://', adapter)
+
+		# mistune is much faster; python-markdown stays available as a fallback
+		self.markdown_backend = markdown_backend if mistune is not None else 'markdown'
+		if self.markdown_backend == 'mistune':
+			self._md = mistune.create_markdown(
+				renderer=_HighlightRenderer(escape=False),
+				plugins=['table', 'strikethrough', 'footnotes', 'task_lists'],
+			)
+			# Heading ids like python-markdown's toc extension, so in-document links keep working
+			self._md.before_render_hooks.append(_add_heading_ids)
+		else:
+			# Extensions are loaded once; the instance is reset before every conversion
+			self._md = markdown.Markdown(extensions=[
+				'markdown.extensions.tables',
+				'markdown.extensions.fenced_code',
+				'markdown.extensions.codehilite',
+				'markdown.extensions.toc',
+			])
+		self._md_lock = threading.Lock()
+
+		# pdfkit turns <meta name="pdfkit-..."> tags in string input into wkhtmltopdf flags,
+		# markdown passes raw HTML through, so documents must not be able to guess the prefix
+		self._meta_tag_prefix = f'md2pdf-{secrets.token_hex(8)}-'
+		self.config = self._pdfkit_configuration() if wkhtmltopdf_path else None
+
+		# A backend created here is closed with the converter, a passed-in one belongs to the caller
+		self._owns_pdf_backend = backend == 'playwright'
+		if self._owns_pdf_backend:
+			self.pdf_backend = PlaywrightBackend()
+		elif isinstance(backend, PlaywrightBackend):
+			self.pdf_backend = backend
+		else:
+			self.pdf_backend = None
 
 		self.pdf_options = {
 			'page-size': 'A4',
@@ -32,6 +507,9 @@ class MarkdownToPDFConverter:
 			'enable-local-file-access': None
 		}
 
+	def _pdfkit_configuration(self):
+		return pdfkit.configuration(wkhtmltopdf=self.wkhtmltopdf_path or '', meta_tag_prefix=self._meta_tag_prefix)
+
 	def read_markdown_file(self, file_path):
 		try:
 			with open(file_path, 'r', encoding='utf-8') as file:
@@ -39,13 +517,15 @@ class MarkdownToPDFConverter:
 		except Exception as e:
 			raise Exception(f"Error reading markdown file: {e}")
 
+	def _local_image_path(self, url, base_path=None):
+		if base_path and not os.path.isabs(url):
+			return os.path.join(os.path.dirname(base_path), url)
+		return url
+
 	def download_image(self, url, base_path=None):
 		try:
 			if not url.startswith(('http://', 'https://')):
-				if base_path and not os.path.isabs(url):
-					local_path = os.path.join(os.path.dirname(base_path), url)
-				else:
-					local_path = url
+				local_path = self._local_image_path(url, base_path)
 
 				if os.path.exists(local_path):
 					with open(local_path, 'rb') as f:
@@ -53,175 +533,232 @@ class MarkdownToPDFConverter:
 				else:
 					return None
 
-			headers = {
-				'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-			}
-			response = requests.get(url, headers=headers, timeout=30)
-			response.raise_for_status()
-			return response.content
+			if url in self._raw_cache:
+				return self._raw_cache[url]
+
+			return self._raw_cache.setdefault(url, self._fetch_remote_image(url))
 
 		except Exception:
 			return None
 
-	def optimize_image(self, image_data, max_width=800, quality=85):
-		try:
-			img = Image.open(io.BytesIO(image_data))
+	def _remote_image_request(self, url):
+		"""Request headers plus the disk cache files used to revalidate url"""
+		headers = {
+			'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+		}
 
-			if img.mode in ('RGBA', 'LA', 'P'):
-				img = img.convert('RGB')
+		cache_file = _IMAGE_CACHE_DIR / hashlib.sha1(url.encode('utf-8')).hexdigest()
+		modified_file = cache_file.with_suffix('.modified')
+		if cache_file.exists() and modified_file.exists():
+			headers['If-Modified-Since'] = modified_file.read_text(encoding='utf-8')
 
-			if img.width > max_width:
-				ratio = max_width / img.width
-				new_height = int(img.height * ratio)
-				img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+		return headers, cache_file, modified_file
 
-			output = io.BytesIO()
-			img.save(output, format='JPEG', quality=quality, optimize=True)
-			return output.getvalue()
+	def _store_remote_image(self, cache_file, modified_file, last_modified, content):
+		if last_modified:
+			try:
+				_private_dir(_IMAGE_CACHE_DIR)
+				# Image first: a crash in between leaves new bytes with an older date, which only revalidates
+				_atomic_write(cache_file, content)
+				_atomic_write(modified_file, last_modified.encode('utf-8'))
+				self._image_cache_grown = True
+			except OSError:
+				pass
+
+	def _read_cached_image(self, cache_file):
+		# Refreshes the mtime so pruning keeps images that are still in use
+		os.utime(cache_file)
+		return cache_file.read_bytes()
+
+	def _fetch_remote_image(self, url):
+		headers, cache_file, modified_file = self._remote_image_request(url)
+
+		response = self._session.get(url, headers=headers, timeout=30)
+		if response.status_code == 304:
+			return self._read_cached_image(cache_file)
+		response.raise_for_status()
+
+		self._store_remote_image(cache_file, modified_file, response.headers.get('Last-Modified'), response.content)
+		return response.content
+
+	async def _fetch_remote_image_async(self, session, url):
+		headers, cache_file, modified_file = self._remote_image_request(url)
 
+		async with session.get(url, headers=headers) as response:
+			if response.status == 304:
+				return self._read_cached_image(cache_file)
+			response.raise_for_status()
+			content = await response.read()
+
+		self._store_remote_image(cache_file, modified_file, response.headers.get('Last-Modified'), content)
+		return content
+
+	async def _fetch_remote_images_async(self, urls):
+		connector = aiohttp.TCPConnector(limit=_ASYNC_DOWNLOAD_LIMIT)
+		timeout = aiohttp.ClientTimeout(total=30)
+		async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+			results = await asyncio.gather(
+				*(self._fetch_remote_image_async(session, url) for url in urls),
+				return_exceptions=True
+			)
+
+		# Failed downloads are left out so download_image retries them through the requests session
+		return {url: result for url, result in zip(urls, results) if result and not isinstance(result, BaseException)}
+
+	def optimize_image(self, image_data, max_width=800, quality=85):
+		return _optimize_image(image_data, max_width, quality)
+
+	def _is_small_jpeg(self, image_data, max_width):
+		try:
+			return _is_small_jpeg(Image.open(io.BytesIO(image_data)), image_data, max_width)
 		except Exception:
-			return image_data
+			return False
+
+	def _get_process_pool(self):
+		if self._process_pool is None:
+			# Forking a process that runs Qt, pool and browser threads can deadlock, so always spawn
+			self._process_pool = ProcessPoolExecutor(max_workers=os.cpu_count(),
+			                                         mp_context=multiprocessing.get_context('spawn'),
+			                                         initializer=_init_image_worker)
+		return self._process_pool
+
+	def _load_images(self, srcs, base_path=None, max_width=800, quality=85):
+		"""Download and optimize each distinct image once, concurrently"""
+		srcs = list(dict.fromkeys(srcs))
+		if not srcs:
+			return {}
+
+		# Remote images are fetched on one event loop; download_image then serves them from the cache
+		remote_srcs = [src for src in srcs if src.startswith(('http://', 'https://')) and src not in self._raw_cache]
+		if aiohttp is not None and len(remote_srcs) > 1 and not _event_loop_running():
+			self._raw_cache.update(asyncio.run(self._fetch_remote_images_async(remote_srcs)))
+
+		with ThreadPoolExecutor(max_workers=min(_MAX_IMAGE_WORKERS, len(srcs))) as executor:
+			downloads = dict(zip(srcs, executor.map(lambda src: self.download_image(src, base_path), srcs)))
+
+		keys = {
+			src: (hashlib.sha1(image_data).digest(), max_width, quality)
+			for src, image_data in downloads.items() if image_data
+		}
+		pending = {key: downloads[src] for src, key in keys.items() if key not in self._opt_cache}
+
+		# Small JPEGs come back unchanged, so they are never shipped to a worker
+		optimized = {key: image_data for key, image_data in pending.items() if self._is_small_jpeg(image_data, max_width)}
+		pending = {key: image_data for key, image_data in pending.items() if key not in optimized}
+
+		# Encoding is CPU-bound, spread it over all cores when there is enough of it
+		tasks = [(image_data, max_width, quality) for image_data in pending.values()]
+		if len(tasks) > 1 and sum(len(image_data) for image_data in pending.values()) >= _PROCESS_POOL_MIN_BYTES:
+			optimized.update(zip(pending, self._get_process_pool().map(_optimize_image_worker, tasks)))
+		else:
+			optimized.update(zip(pending, map(_optimize_image_worker, tasks)))
+		for key, image_data in optimized.items():
+			self._opt_cache[key] = image_data
+			self._opt_cache_bytes += len(image_data or b'')
+
+		images = {src: self._opt_cache[keys[src]] if src in keys else None for src in srcs}
+		self._trim_opt_cache(keys.values())
+		return images
+
+	def _trim_opt_cache(self, used_keys):
+		for key in used_keys:
+			self._opt_cache.move_to_end(key)
+
+		while self._opt_cache_bytes > _OPT_CACHE_MAX_BYTES and self._opt_cache:
+			_, image_data = self._opt_cache.popitem(last=False)
+			self._opt_cache_bytes -= len(image_data or b'')
+
+	def _image_uri(self, image_data):
+		if self._image_dir is None:
+			self._image_dir = tempfile.mkdtemp(prefix='md2pdf_')
+			self.temp_files.append(self._image_dir)
+
+		# Named by content, so an image used several times is written once
+		file_name = f"{hashlib.sha1(image_data).hexdigest()[:16]}.{_image_extension(image_data)}"
+		image_path = Path(self._image_dir) / file_name
+		if not image_path.exists():
+			image_path.write_bytes(image_data)
+		return image_path.as_uri()
+
+	def _image_uris(self, images):
+		"""Write each loaded image once and map its src to the file URI"""
+		return {src: self._image_uri(image_data) for src, image_data in images.items() if image_data}
 
 	def embed_images_in_html(self, html_content, base_path=None):
+		img_count = len(_IMG_OPEN_RE.findall(html_content))
+		if not img_count:
+			return html_content
+
+		# The regex only handles plain quoted src attributes, anything else goes through the parser
+		img_matches = _IMG_RE.findall(html_content)
+		if 'srcset' in html_content or len(img_matches) != img_count:
+			return self._embed_images_with_soup(html_content, base_path)
+
+		return self._rewrite_img_tags(html_content, base_path, [html.unescape(src) for _, _, src, _ in img_matches])
+
+	def _rewrite_img_tags(self, html_content, base_path=None, srcs=None):
+		if srcs is None:
+			srcs = [html.unescape(match.group(3)) for match in _IMG_RE.finditer(html_content)]
+		image_uris = self._image_uris(self._load_images(srcs, base_path))
+		return _IMG_RE.sub(lambda match: self._replace_img(match, image_uris), html_content)
+
+	def _replace_img(self, match, image_uris):
+		before, _, src, after = match.groups()
+		image_uri = image_uris.get(html.unescape(src))
+		if not image_uri:
+			return match.group(0)
+
+		before, styled = _STYLE_RE.subn(_add_img_style, before, count=1)
+		if not styled:
+			after, styled = _STYLE_RE.subn(_add_img_style, after, count=1)
+		if not styled:
+			after = f' style="{_IMG_STYLE}"{after}'
+
+		return f'<img{before} src="{image_uri}"{after}>'
+
+	def _embed_images_with_soup(self, html_content, base_path=None):
+		# html.parser keeps the fragment as-is; lxml would move raw <style>/<meta>/<title> into a <head>
 		soup = BeautifulSoup(html_content, 'html.parser')
 
-		for img_tag in soup.find_all('img'):
-			src = img_tag.get('src')
-			if not src:
-				continue
+		img_tags = [img_tag for img_tag in soup.find_all('img') if img_tag.get('src')]
+		image_uris = self._image_uris(self._load_images((img_tag['src'] for img_tag in img_tags), base_path))
 
-			image_data = self.download_image(src, base_path)
-			if image_data:
-				optimized_data = self.optimize_image(image_data)
-				base64_data = base64.b64encode(optimized_data).decode('utf-8')
-				img_tag['src'] = f"data:image/jpeg;base64,{base64_data}"
+		for img_tag in img_tags:
+			image_uri = image_uris.get(img_tag['src'])
+			if image_uri:
+				img_tag['src'] = image_uri
 
 				style = img_tag.get('style', '')
 				if 'max-width' not in style:
-					style += 'max-width: 100%; height: auto;'
+					style += _IMG_STYLE
 				img_tag['style'] = style
 
 		return str(soup)
 
 	def markdown_to_html(self, markdown_content):
-		extensions = [
-			'markdown.extensions.tables',
-			'markdown.extensions.fenced_code',
-			'markdown.extensions.codehilite',
-			'markdown.extensions.toc',
-		]
+		if self.markdown_backend == 'mistune':
+			return self._md(markdown_content)
 
-		md = markdown.Markdown(extensions=extensions)
-		html_content = md.convert(markdown_content)
-		return html_content
+		# Markdown instances are stateful, the preview and the conversion thread may share one
+		with self._md_lock:
+			return self._md.reset().convert(markdown_content)
 
-	def create_full_html(self, html_content, title="Converted Document"):
-		css_styles = """
-        <style>
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 100%;
-                margin: 0;
-                padding: 20px;
-            }
-
-            h1, h2, h3, h4, h5, h6 {
-                color: #2c3e50;
-                margin-top: 2em;
-                margin-bottom: 1em;
-            }
-
-            h1 { font-size: 2.5em; border-bottom: 2px solid #3498db; padding-bottom: 10px; }
-            h2 { font-size: 2em; border-bottom: 1px solid #bdc3c7; padding-bottom: 5px; }
-            h3 { font-size: 1.5em; }
-
-            p { margin-bottom: 1em; text-align: justify; }
-
-            img {
-                max-width: 100%;
-                height: auto;
-                display: block;
-                margin: 20px auto;
-                border-radius: 5px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }
-
-            code {
-                background-color: #f8f9fa;
-                padding: 2px 4px;
-                border-radius: 3px;
-                font-family: 'Courier New', monospace;
-                font-size: 0.9em;
-            }
-
-            pre {
-                background-color: #f8f9fa;
-                padding: 15px;
-                border-radius: 5px;
-                border-left: 4px solid #3498db;
-                overflow-x: auto;
-                margin: 1em 0;
-            }
-
-            pre code {
-                background: none;
-                padding: 0;
-            }
-
-            table {
-                border-collapse: collapse;
-                width: 100%;
-                margin: 1em 0;
-            }
-
-            th, td {
-                border: 1px solid #ddd;
-                padding: 12px;
-                text-align: left;
-            }
-
-            th {
-                background-color: #f2f2f2;
-                font-weight: bold;
-            }
-
-            blockquote {
-                border-left: 4px solid #3498db;
-                margin: 1em 0;
-                padding-left: 20px;
-                color: #666;
-                font-style: italic;
-            }
-
-            ul, ol {
-                margin: 1em 0;
-                padding-left: 2em;
-            }
-
-            li {
-                margin-bottom: 0.5em;
-            }
-
-            a {
-                color: #3498db;
-                text-decoration: none;
-            }
-
-            a:hover {
-                text-decoration: underline;
-            }
-        </style>
-        """
+	def _css_uri(self):
+		if self._css_path is None:
+			with tempfile.NamedTemporaryFile(mode='w', suffix='.css',
+			                                 delete=False, encoding='utf-8') as css_file:
+				css_file.write(_CSS_STYLES)
+				self._css_path = css_file.name
+		return Path(self._css_path).as_uri()
 
+	def create_full_html(self, html_content, title="Converted Document"):
 		full_html = f"""
         <!DOCTYPE html>
         <html>
         <head>
             <meta charset="UTF-8">
             <title>{title}</title>
-            {css_styles}
+            <link rel="stylesheet" href="{self._css_uri()}">
         </head>
         <body>
             {html_content}
@@ -231,29 +768,149 @@ class MarkdownToPDFConverter:
 
 		return full_html
 
-	def convert_to_pdf(self, markdown_file_path, output_pdf_path=None, title=None):
+	def _build_body_html(self, markdown_file_path):
+		markdown_content = self.read_markdown_file(markdown_file_path)
+		html_content = self.markdown_to_html(markdown_content)
+		return self.embed_images_in_html(html_content, markdown_file_path)
+
+	def _write_temp_html(self, full_html):
+		fd, temp_html_path = tempfile.mkstemp(suffix='.html')
+		self.temp_files.append(temp_html_path)
+
+		# Encoded once and written straight to the descriptor, bypassing the text I/O layer
+		data = memoryview(full_html.encode('utf-8'))
 		try:
-			markdown_content = self.read_markdown_file(markdown_file_path)
-			html_content = self.markdown_to_html(markdown_content)
-			html_with_images = self.embed_images_in_html(html_content, markdown_file_path)
+			while data:
+				data = data[os.write(fd, data):]
+		finally:
+			os.close(fd)
+		return temp_html_path
+
+	def _merge_pdf_options(self, options=None):
+		# Per-call options override the defaults without mutating them
+		return {**self.pdf_options, **options} if options else self.pdf_options
+
+	def _render_pdf(self, temp_html_path, output_pdf_path, options=None):
+		pdf_options = self._merge_pdf_options(options)
+
+		if self.pdf_backend is not None:
+			self.pdf_backend.from_file(temp_html_path, output_pdf_path, pdf_options)
+		else:
+			pdfkit.from_file(temp_html_path, output_pdf_path,
+			                 options=pdf_options, configuration=self.config)
+
+	def _image_srcs(self, html_content):
+		img_matches = _IMG_RE.findall(html_content)
+		if len(img_matches) == len(_IMG_OPEN_RE.findall(html_content)):
+			return [html.unescape(src) for _, _, src, _ in img_matches]
+
+		soup = BeautifulSoup(html_content, 'html.parser')
+		return [img_tag.get('src', '') for img_tag in soup.find_all('img')]
+
+	def _wkhtmltopdf_version_key(self):
+		# The binary's path and mtime, so switching or upgrading wkhtmltopdf renders again
+		binary = self.wkhtmltopdf_path or shutil.which('wkhtmltopdf') or ''
+		try:
+			return f'wkhtmltopdf|{binary}|{os.stat(binary).st_mtime_ns}'
+		except OSError:
+			return f'wkhtmltopdf|{binary}'
+
+	def _pdf_cache_file(self, html_content, base_path, title, options=None):
+		"""Cache entry for this rendered markdown, its local images and settings, or None if uncacheable"""
+		srcs = self._image_srcs(html_content)
+
+		# Remote images (and srcset candidates) can change without anything local changing
+		if 'srcset' in html_content or any(src.startswith(('http://', 'https://')) for src in srcs):
+			return None
+
+		key_parts = [
+			str(_PDF_CACHE_VERSION),
+			hashlib.sha1(_CSS_STYLES.encode('utf-8')).hexdigest(),
+			html_content,
+			title,
+			json.dumps(self._merge_pdf_options(options), sort_keys=True),
+			'playwright' if self.pdf_backend is not None else self._wkhtmltopdf_version_key(),
+		]
+		for src in sorted(set(srcs)):
+			local_path = self._local_image_path(src, base_path)
+			try:
+				stat = os.stat(local_path)
+				key_parts.append(f'{local_path}|{stat.st_mtime_ns}|{stat.st_size}')
+			except OSError:
+				key_parts.append(f'{local_path}|missing')
+
+		key = '\0'.join(key_parts)
+		return _PDF_CACHE_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.pdf"
 
+	def _store_cached_pdf(self, cache_file, output_pdf_path):
+		try:
+			_private_dir(_PDF_CACHE_DIR)
+			_atomic_write(cache_file, Path(output_pdf_path).read_bytes())
+			_prune_cache(_PDF_CACHE_DIR, _PDF_CACHE_MAX_BYTES)
+		except OSError:
+			pass
+
+	def convert_to_pdf(self, markdown_file_path, output_pdf_path=None, title=None, options=None):
+		try:
 			if not title:
 				title = Path(markdown_file_path).stem
 
-			full_html = self.create_full_html(html_with_images, title)
-
 			if not output_pdf_path:
 				md_path = Path(markdown_file_path)
 				output_pdf_path = md_path.parent / f"{md_path.stem}.pdf"
 
-			with tempfile.NamedTemporaryFile(mode='w', suffix='.html',
-			                                 delete=False, encoding='utf-8') as temp_html:
-				temp_html.write(full_html)
-				temp_html_path = temp_html.name
-				self.temp_files.append(temp_html_path)
+			markdown_content = self.read_markdown_file(markdown_file_path)
+			html_content = self.markdown_to_html(markdown_content)
 
-			pdfkit.from_file(temp_html_path, output_pdf_path,
-			                 options=self.pdf_options, configuration=self.config)
+			# Unchanged document, local images and settings: reuse the PDF rendered last time
+			cache_file = self._pdf_cache_file(html_content, markdown_file_path, title, options)
+			if cache_file is not None and cache_file.exists():
+				shutil.copyfile(cache_file, output_pdf_path)
+				os.utime(cache_file)
+				return output_pdf_path
+
+			html_with_images = self.embed_images_in_html(html_content, markdown_file_path)
+			full_html = self.create_full_html(html_with_images, title)
+
+			if self.pdf_backend is None:
+				# Looked up on first use, so a converter for another backend works without wkhtmltopdf
+				if self.config is None:
+					self.config = self._pdfkit_configuration()
+
+				# wkhtmltopdf reads the page from stdin, no temporary HTML file needed
+				pdfkit.from_string(full_html, output_pdf_path,
+				                   options=self._merge_pdf_options(options), configuration=self.config)
+			else:
+				# Chromium only loads file:// images and CSS for pages that come from disk
+				self._render_pdf(self._write_temp_html(full_html), output_pdf_path, options)
+
+			if cache_file is not None:
+				self._store_cached_pdf(cache_file, output_pdf_path)
+
+			return output_pdf_path
+
+		except Exception as e:
+			raise Exception(f"Error converting to PDF: {e}")
+
+		finally:
+			self.cleanup()
+
+	def convert_many(self, markdown_file_paths, output_pdf_path, options=None):
+		"""Convert several markdown files into one PDF with a single renderer run"""
+		try:
+			bodies = [self._build_body_html(markdown_file_path) for markdown_file_path in markdown_file_paths]
+
+			if self.pdf_backend is not None:
+				# Chromium prints a single page per run, so the files are joined into one document
+				full_html = self.create_full_html(_PAGE_BREAK.join(bodies), Path(output_pdf_path).stem)
+				self._render_pdf(self._write_temp_html(full_html), output_pdf_path, options)
+			else:
+				temp_html_paths = [
+					self._write_temp_html(self.create_full_html(body, Path(markdown_file_path).stem))
+					for markdown_file_path, body in zip(markdown_file_paths, bodies)
+				]
+				# wkhtmltopdf accepts multiple inputs and concatenates them
+				self._render_pdf(temp_html_paths, output_pdf_path, options)
 
 			return output_pdf_path
 
@@ -266,8 +923,47 @@ class MarkdownToPDFConverter:
 	def cleanup(self):
 		for temp_file in self.temp_files:
 			try:
-				if os.path.exists(temp_file):
+				if os.path.isdir(temp_file):
+					shutil.rmtree(temp_file, ignore_errors=True)
+				elif os.path.exists(temp_file):
 					os.unlink(temp_file)
 			except Exception:
 				pass
 		self.temp_files = []
+		self._image_dir = None
+
+		# Remote images are revalidated against the disk cache on the next conversion
+		self._raw_cache.clear()
+
+		if self._image_cache_grown:
+			self._image_cache_grown = False
+			try:
+				_prune_cache(_IMAGE_CACHE_DIR, _IMAGE_CACHE_MAX_BYTES)
+			except OSError:
+				pass
+
+		# Drops pooled connections; the session opens new ones if it is used again
+		self._session.close()
+
+	def close(self):
+		"""Remove the stylesheet and shut down the image process pool and the PDF backend if this converter started it"""
+		if self._css_path is not None:
+			try:
+				os.unlink(self._css_path)
+			except OSError:
+				pass
+			self._css_path = None
+
+		if self._process_pool is not None:
+			self._process_pool.shutdown()
+			self._process_pool = None
+
+		if self._owns_pdf_backend:
+			self.pdf_backend.close()
+			self._owns_pdf_backend = False
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()